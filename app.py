@@ -1,9 +1,16 @@
 import base64
-import json
+import hashlib
+import math
+import re
+import uuid
 from datetime import date
+from functools import lru_cache
+import orjson
 import pandas as pd
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # =========================
 # CONFIG + STYLE
@@ -63,19 +70,57 @@ STAGES = [
     ("TERBAYAR", "6) Terbayar"),
     ("SUPPLY", "7) Supply Barang"),
 ]
+# judul kolom tahap di tabel ringkas
+STAGE_SHORT = {
+    "EVALUASI": "Evaluasi",
+    "SURAT_USULAN": "Usulan",
+    "SURAT_PERSETUJUAN": "Persetujuan",
+    "SP2BJ": "SP2BJ",
+    "PO": "PO",
+    "TERBAYAR": "Terbayar",
+    "SUPPLY": "Supply",
+}
 STATUS_OPTIONS = ["None", "In Process", "Done"]
+TABLE_PAGE_SIZE = 50
+
+# (code, label, kolom status, kolom tanggal) per tahap — nama kolom dihitung sekali saat import
+STAGE_COLS = [(code, label, f"{code}_STATUS", f"{code}_TANGGAL") for code, label in STAGES]
+BASE_COLS = ("REQUEST_ID", "TANGGAL_UPLOAD", "NO_SPBJ_KAPAL", "JUDUL_PERMINTAAN", "FILES_JSON", "LAST_UPDATE")
+STATUS_COLS = tuple(s_col for _code, _label, s_col, _d_col in STAGE_COLS)
+DATE_COLS = tuple(d_col for _code, _label, _s_col, d_col in STAGE_COLS)
 
 
 # =========================
 # API HELPERS
 # =========================
+# Satu session untuk semua call API, supaya koneksi TCP+TLS ke Apps Script dipakai ulang (keep-alive).
+# Retry hanya untuk gagal konek (request belum terkirim). POST tidak di-retry saat read error / 5xx,
+# supaya submit_request / update_request tidak pernah terkirim dobel.
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=10,
+        max_retries=Retry(total=3, backoff_factor=0.3),
+    ),
+)
+
+
 def post_api(payload: dict) -> dict:
-    r = requests.post(WEBAPP_URL, json=payload, timeout=60)
+    r = _SESSION.post(
+        WEBAPP_URL,
+        data=orjson.dumps(payload),
+        headers={"Content-Type": "application/json"},
+        timeout=60,
+    )
     r.raise_for_status()
-    return r.json()
+    return orjson.loads(r.content)
 
 
-def api_submit_request(tanggal_upload: date, no_spbj: str, judul: str, files_payload: list[dict]) -> dict:
+def api_submit_request(
+    tanggal_upload: date, no_spbj: str, judul: str, files_payload: list[dict], idempotency_key: str
+) -> dict:
     return post_api(
         {
             "action": "submit_request",
@@ -83,16 +128,21 @@ def api_submit_request(tanggal_upload: date, no_spbj: str, judul: str, files_pay
             "no_spbj_kapal": (no_spbj or "").strip(),
             "judul_permintaan": judul.strip(),
             "files": files_payload,
+            "idempotency_key": idempotency_key,
         }
     )
 
 
+@st.cache_data(ttl=30, show_spinner=False)
 def api_list_requests(key: str) -> pd.DataFrame:
     res = post_api({"action": "list_requests", "key": key})
     if not res.get("ok"):
         raise RuntimeError(res.get("error", "API list_requests gagal"))
     rows = res.get("data") or res.get("rows") or []
-    return pd.DataFrame(rows)
+    df = pd.DataFrame(rows)
+    # NORMALISASI KOLOM (penting agar nyambung ke spreadsheet) — di sini supaya ikut ter-cache
+    df.columns = df.columns.astype(str).str.strip().str.upper()
+    return df
 
 
 def api_update_request(request_id: str, fields: dict) -> dict:
@@ -109,16 +159,42 @@ def api_update_request(request_id: str, fields: dict) -> dict:
 # =========================
 # DATA HELPERS
 # =========================
+# lowercase -> status baku; yang tidak ada di map dianggap "None"
+_STATUS_MAP = {
+    **dict.fromkeys(
+        ["in process", "in_progress", "progress", "on progress", "ongoing", "process", "proses"], "In Process"
+    ),
+    **dict.fromkeys(
+        ["done", "selesai", "completed", "finish", "finished", "ok", "yes", "y", "true", "1", "checked"], "Done"
+    ),
+}
+
+
+def ensure_cols(df: pd.DataFrame, cols: tuple[str, ...], default="") -> pd.DataFrame:
+    """Tambah kolom yang belum ada sekaligus (satu concat, bukan df[c] = ... per kolom)."""
+    existing = set(df.columns)
+    missing = [c for c in cols if c not in existing]
+    if not missing:
+        return df
+    filler = pd.DataFrame({c: default for c in missing}, index=df.index)
+    return pd.concat([df, filler], axis=1)
+
+
 def clean_status(x) -> str:
-    s = str(x or "").strip()
-    if not s or s.lower() == "none":
-        return "None"
-    low = s.lower()
-    if low in ["in process", "in_progress", "progress", "ongoing", "process"]:
-        return "In Process"
-    if low in ["done", "selesai", "completed", "finish", "finished", "ok", "yes", "true", "1"]:
-        return "Done"
-    return "None"
+    return _STATUS_MAP.get(str(x or "").strip().lower(), "None")
+
+
+# status hanya 3 nilai => simpan sebagai kategori (kode int8), bukan object string
+STATUS_DTYPE = pd.CategoricalDtype(categories=STATUS_OPTIONS)
+
+
+def clean_status_series(s: pd.Series) -> pd.Series:
+    """Versi vektor dari clean_status untuk satu kolom; hasilnya bertipe STATUS_DTYPE."""
+    return s.astype(str).str.strip().str.lower().map(_STATUS_MAP).fillna("None").astype(STATUS_DTYPE)
+
+
+# nilai kosong yang sering muncul dari sheet / pandas
+_NULL_DATE_TOKENS = frozenset({"", "none", "nan", "nat"})
 
 
 def parse_date_any(x):
@@ -128,14 +204,24 @@ def parse_date_any(x):
     """
     if x is None:
         return None
-    s = str(x).strip()
-    if s == "" or s.lower() == "none":
+    return _parse_date_str(str(x))
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_str(s: str) -> date | None:
+    # string tanggal yang sama berulang di banyak baris/rerun, jadi seluruh normalisasi + parse di-cache
+    s = s.strip()
+    if s.lower() in _NULL_DATE_TOKENS:
         return None
-    if "T" in s:
-        s = s.split("T")[0]
+    return _parse_iso_day(s.split("T", 1)[0][:10])
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso_day(s: str) -> date | None:
+    # s sudah dinormalisasi ke bagian tanggal (maks. 10 karakter), jadi jumlah nilai unik ~ jumlah hari
     try:
-        return date.fromisoformat(s[:10])
-    except Exception:
+        return date.fromisoformat(s)
+    except ValueError:
         return None
 
 
@@ -149,35 +235,86 @@ def fmt_ddmmyyyy(x) -> str:
     return d.strftime("%d-%m-%Y") if d else ""
 
 
-def stage_cell(status, tanggal) -> str:
-    stt = clean_status(status)
-    t = fmt_ddmmyyyy(tanggal)
-    if stt == "Done" and t:
-        return f"✅ Done • {t}"
-    if stt == "In Process":
-        return "🟡 In Process"
-    return "⚪ None"
+def to_datetime_series(s: pd.Series) -> pd.Series:
+    """
+    Versi vektor dari parse_date_any untuk satu kolom: datetime64 (tanpa jam), NaT jika kosong/tidak valid.
+    Normalisasi (strip, potong di 'T', 10 karakter) dikerjakan vektor dengan aturan yang sama seperti
+    _parse_date_str; tiap hari unik lalu di-parse dengan _parse_iso_day, supaya hasil sama persis dengan panel detail.
+    """
+    day = s.astype(str).str.strip().str.split("T", n=1).str[0].str.slice(0, 10)
+    parsed = {v: _parse_iso_day(v) for v in day.unique()}
+    return pd.to_datetime(day.map(parsed), errors="coerce")
+
+
+def fmt_ddmmyyyy_series(s: pd.Series) -> pd.Series:
+    """Versi vektor dari fmt_ddmmyyyy untuk satu kolom."""
+    return to_datetime_series(s).dt.strftime("%d-%m-%Y").fillna("")
+
+
+def stage_cell_series(status: pd.Series, tanggal: pd.Series) -> pd.Series:
+    """
+    Isi sel tahap untuk tabel ringkas: '✅ Done • DD-MM-YYYY', '🟡 In Process', atau '⚪ None'.
+    `status` harus sudah lewat clean_status_series.
+    """
+    t = fmt_ddmmyyyy_series(tanggal)
+    out = pd.Series("⚪ None", index=status.index)
+    out = out.mask(status == "In Process", "🟡 In Process")
+    return out.mask((status == "Done") & (t != ""), "✅ Done • " + t)
+
+
+# awal string JSON (boleh diawali spasi); match() tanpa strip() => tidak alokasi string baru
+_FILES_JSON_RE = re.compile(r"\s*[\[{]")
+
+
+def looks_like_files_json_str(s) -> bool:
+    return isinstance(s, str) and _FILES_JSON_RE.match(s) is not None
 
 
 def parse_files_json(x):
-    if not x:
+    # jalur umum dulu: string; kebanyakan bukan JSON sehingga cukup cek karakter pertama
+    if isinstance(x, str):
+        c = x[:1]
+        if c not in ("[", "{") and not (c.isspace() and looks_like_files_json_str(x)):
+            return []
+        try:
+            obj = orjson.loads(x)
+        except orjson.JSONDecodeError:
+            return []
+        if isinstance(obj, list):
+            return obj
+        if isinstance(obj, dict):
+            return [obj]
         return []
     if isinstance(x, list):
         return x
-    if isinstance(x, str):
-        s = x.strip()
-        if s.startswith("[") or s.startswith("{"):
-            try:
-                obj = json.loads(s)
-                if isinstance(obj, list):
-                    return obj
-                if isinstance(obj, dict):
-                    return [obj]
-            except Exception:
-                return []
+    if isinstance(x, dict):
+        return [x]
+    if isinstance(x, tuple):
+        return list(x)
     return []
 
 
+def b64_encode_file(f) -> str:
+    """
+    Base64 isi file upload. UploadedFile adalah BytesIO yang sudah memegang seluruh isi file,
+    jadi encode langsung dari memoryview-nya (getbuffer) tanpa menyalin ke bytes baru lewat read().
+    """
+    with f.getbuffer() as buf:
+        return base64.b64encode(buf).decode("ascii")
+
+
+def file_sha256(f) -> str:
+    # hash langsung dari memoryview UploadedFile, sama seperti b64_encode_file (tanpa salinan bytes)
+    with f.getbuffer() as buf:
+        return hashlib.sha256(buf).hexdigest()
+
+
+def submit_fingerprint(tanggal_upload: date, no_spbj: str, judul: str, files: list) -> str:
+    """Sidik isi permintaan upload (field form + nama & isi file) untuk menentukan idempotency key."""
+    parts = [tanggal_upload.isoformat(), (no_spbj or "").strip(), judul.strip(), [[f.name, file_sha256(f)] for f in files]]
+    return hashlib.sha256(orjson.dumps(parts)).hexdigest()
+
+
 def first_file_download_link(files_json: str) -> str:
     files = parse_files_json(files_json)
     if not files:
@@ -192,6 +329,156 @@ def first_file_download_link(files_json: str) -> str:
     return ""
 
 
+# =========================
+# DATA PREP (di-cache)
+# =========================
+def prepare_frames(
+    raw: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.DataFrame, dict[str, dict], dict[str, list[dict]]]:
+    """
+    Normalisasi + auto-clean data mentah dari list_requests, lalu bangun tabel ringkas.
+    Return: (df lengkap, show_df untuk st.dataframe, rid_map REQUEST_ID -> row dict,
+             files_by_rid REQUEST_ID -> daftar lampiran hasil parse FILES_JSON)
+    """
+    # Pastikan kolom minimal + tanggal tahap ada (default ""), lalu status tahap (default "None")
+    df = ensure_cols(raw, BASE_COLS + DATE_COLS)
+    df = ensure_cols(df, STATUS_COLS, default="None")
+
+    # AUTO-CLEAN: jika status bukan Done => tanggal dikosongkan
+    for _code, _label, s_col, d_col in STAGE_COLS:
+        df[s_col] = clean_status_series(df[s_col])
+        df.loc[df[s_col] != "Done", d_col] = ""
+
+    # file link pertama (ringkas); sel non-JSON sudah ditolak murah oleh cek karakter pertama di parse_files_json
+    df["FILE_1"] = df["FILES_JSON"].map(first_file_download_link)
+
+    show_df = pd.DataFrame(
+        {
+            "REQUEST_ID": df["REQUEST_ID"].astype(str),
+            # tetap datetime; format DD-MM-YYYY dikerjakan di frontend lewat DateColumn
+            "TGL_UPLOAD": to_datetime_series(df["TANGGAL_UPLOAD"]),
+            "NO_SPBJ": df["NO_SPBJ_KAPAL"].astype(str),
+            "JUDUL": df["JUDUL_PERMINTAAN"].astype(str),
+            "LAMPIRAN": df["FILE_1"].astype(str),
+            **{STAGE_SHORT[code]: stage_cell_series(df[s_col], df[d_col]) for code, _label, s_col, d_col in STAGE_COLS},
+        }
+    )
+    # index REQUEST_ID -> row dict (baris pertama menang jika ada ID dobel)
+    rid_map = {}
+    for rid, rec in zip(df["REQUEST_ID"].astype(str), df.to_dict("records")):
+        rid_map.setdefault(rid, rec)
+
+    # lampiran di-parse sekali di sini, supaya panel detail tidak parse JSON tiap rerun
+    files_by_rid = {rid: parse_files_json(rec.get("FILES_JSON")) for rid, rec in rid_map.items()}
+
+    return df, show_df, rid_map, files_by_rid
+
+
+@st.cache_resource(ttl=30, show_spinner=False)
+def load_teknik_frames(key: str) -> tuple[pd.DataFrame, pd.DataFrame, dict[str, dict], dict[str, list[dict]]] | None:
+    """
+    list_requests + prepare_frames, sekali per TTL. cache_resource mengembalikan objek yang sama tanpa
+    pickle/copy dan tanpa hash DataFrame tiap rerun, sehingga lookup rid_map benar-benar O(1) per rerun.
+    Hasilnya dipakai bersama semua sesi => READ-ONLY, jangan dimutasi.
+    Return None jika belum ada permintaan.
+    """
+    raw = api_list_requests(key)
+    if raw.empty:
+        return None
+    return prepare_frames(raw)
+
+
+def clear_teknik_cache():
+    api_list_requests.clear()
+    load_teknik_frames.clear()
+    teknik_csv_bytes.clear()
+
+
+def search_mask(df: pd.DataFrame, q: str) -> pd.Series:
+    """Baris yang REQUEST_ID / NO_SPBJ_KAPAL / JUDUL_PERMINTAAN-nya memuat q (case-insensitive)."""
+    qq = q.lower()
+    return (
+        df["REQUEST_ID"].astype(str).str.lower().str.contains(qq, na=False)
+        | df["NO_SPBJ_KAPAL"].astype(str).str.lower().str.contains(qq, na=False)
+        | df["JUDUL_PERMINTAAN"].astype(str).str.lower().str.contains(qq, na=False)
+    )
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def teknik_csv_bytes(key: str, q: str) -> bytes:
+    """
+    CSV tabel ringkas (sesuai pencarian q). Di-cache per (key, q) supaya rerun tidak hash show_df.
+    Tanggal DD-MM-YYYY seperti di sel tahap; utf-8-sig (BOM) supaya emoji/"•" terbaca benar di Excel.
+    """
+    frames = load_teknik_frames(key)
+    if frames is None:
+        return b""
+    df, show_df, _rid_map, _files_by_rid = frames
+    if q:
+        show_df = show_df[search_mask(df, q)]
+    return show_df.to_csv(index=False, date_format="%d-%m-%Y").encode("utf-8-sig")
+
+
+# =========================
+# UPDATE FORM (fragment)
+# =========================
+@st.fragment
+def update_form(row: dict, selected_rid: str):
+    """
+    Form update progress untuk satu REQUEST_ID. Sebagai fragment, submit hanya me-rerun bagian ini;
+    seluruh halaman baru di-rerun setelah update berhasil supaya tabel ikut segar.
+    """
+    st.info(
+        "Aturan: pilih **Done** ➜ wajib isi tanggal. Pilih **None/In Process** ➜ tanggal otomatis kosong. "
+        "Perubahan baru dikirim saat klik **Simpan Update**."
+    )
+
+    # Semua widget di dalam form: ganti status/tanggal tidak memicu rerun (dan tidak ambil ulang data),
+    # hanya satu POST update saat submit.
+    with st.form(f"teknik_form_{selected_rid}", clear_on_submit=False):
+        inputs = {}
+
+        for code, label, s_col, d_col in STAGE_COLS:
+            st.markdown(f"#### {label}")
+
+            cur_status = clean_status(row.get(s_col, "None"))
+            status = st.selectbox(
+                f"Status {label}",
+                STATUS_OPTIONS,
+                index=STATUS_OPTIONS.index(cur_status) if cur_status in STATUS_OPTIONS else 0,
+                key=f"{selected_rid}_{code}_status",
+            )
+
+            cur_date = parse_date_any(row.get(d_col))
+            dval = st.date_input(
+                f"Tanggal {label} (dipakai jika Done)",
+                value=cur_date or date.today(),
+                format="DD/MM/YYYY",
+                key=f"{selected_rid}_{code}_date",
+            )
+            inputs[(s_col, d_col)] = (status, dval)
+
+        st.markdown("---")
+        save = st.form_submit_button("💾 Simpan Update")
+
+    if save:
+        patch = {}
+        for (s_col, d_col), (status, dval) in inputs.items():
+            patch[s_col] = status
+            patch[d_col] = iso_or_empty(dval) if status == "Done" else ""
+
+        try:
+            res = api_update_request(str(selected_rid), patch)
+            if res.get("ok"):
+                st.success("✅ Update tersimpan.")
+                clear_teknik_cache()
+                st.rerun(scope="app")
+            else:
+                st.error(f"Gagal: {res.get('error')}")
+        except Exception as e:
+            st.error(f"Error simpan: {e}")
+
+
 # =========================
 # UI
 # =========================
@@ -231,19 +518,27 @@ with tab_kapal:
             st.warning("Minimal upload 1 file.")
             st.stop()
 
+        # Key unik per isi permintaan: kalau isi yang sama dikirim ulang setelah timeout/error koneksi,
+        # backend bisa mengenalinya dan tidak membuat baris/file dobel. Isi berbeda => key baru.
+        fingerprint = submit_fingerprint(tanggal_upload, no_spbj, judul, files)
+        if st.session_state.get("submit_fp") != fingerprint:
+            st.session_state.submit_fp = fingerprint
+            st.session_state.submit_key = str(uuid.uuid4())
+
         files_payload = []
         for f in files:
-            content = f.read()
             files_payload.append(
                 {
                     "name": f.name,
                     "mime": f.type or "application/octet-stream",
-                    "b64": base64.b64encode(content).decode("utf-8"),
+                    "b64": b64_encode_file(f),
                 }
             )
 
         try:
-            res = api_submit_request(tanggal_upload, no_spbj, judul, files_payload)
+            res = api_submit_request(tanggal_upload, no_spbj, judul, files_payload, st.session_state.submit_key)
+            # server sudah menjawab pasti (ok / ok:false) => kiriman berikutnya selalu pakai key baru
+            st.session_state.pop("submit_fp", None)
             if res.get("ok"):
                 st.success(f"✅ Berhasil! REQUEST_ID: {res.get('request_id')}")
                 st.info("Simpan REQUEST_ID ini. Tim Teknik akan memproses dan update status.")
@@ -275,88 +570,66 @@ with tab_teknik:
                 st.error("Password salah.")
         st.stop()
 
-    col_top1, col_top2 = st.columns([1, 4])
+    col_top1, col_top2, col_top3 = st.columns([1, 1, 3])
     with col_top1:
         if st.button("Logout"):
             st.session_state.teknik_logged = False
             st.rerun()
     with col_top2:
+        if st.button("🔄 Refresh"):
+            clear_teknik_cache()
+            st.rerun()
+    with col_top3:
         st.caption("Tips: gunakan search agar tabel tidak terlalu panjang.")
 
     # ambil data
     try:
-        df = api_list_requests(TEKNIK_KEY)
+        frames = load_teknik_frames(TEKNIK_KEY)
     except Exception as e:
         st.error(f"Error ambil data: {e}")
         st.stop()
 
-    if df.empty:
+    if frames is None:
         st.info("Belum ada permintaan masuk.")
         st.stop()
 
-    # NORMALISASI KOLOM (penting agar nyambung ke spreadsheet)
-    df.columns = [str(c).strip().upper() for c in df.columns]
-
-    # Pastikan kolom minimal ada
-    base_cols = ["REQUEST_ID", "TANGGAL_UPLOAD", "NO_SPBJ_KAPAL", "JUDUL_PERMINTAAN", "FILES_JSON", "LAST_UPDATE"]
-    for c in base_cols:
-        if c not in df.columns:
-            df[c] = ""
-
-    # Pastikan stage status/tanggal ada
-    for code, _label in STAGES:
-        s_col = f"{code}_STATUS"
-        d_col = f"{code}_TANGGAL"
-        if s_col not in df.columns:
-            df[s_col] = "None"
-        if d_col not in df.columns:
-            df[d_col] = ""
-
-    # AUTO-CLEAN: jika status bukan Done => tanggal dikosongkan
-    for code, _label in STAGES:
-        s_col = f"{code}_STATUS"
-        d_col = f"{code}_TANGGAL"
-        df[s_col] = df[s_col].apply(clean_status)
-        df.loc[df[s_col] != "Done", d_col] = ""
-
-    # file link pertama (ringkas)
-    df["FILE_1"] = df["FILES_JSON"].apply(first_file_download_link)
+    df, show_all, rid_map, files_by_rid = frames
 
     st.markdown("### Daftar Permintaan (Ringkas)")
     q = st.text_input("🔎 Cari (No SPBJ / Judul / Request ID)", placeholder="contoh: 123 / pompa / REQ-...", key="teknik_search")
 
-    df_view = df.copy()
+    # df_view/show_df hanya dibaca, jadi tanpa filter cukup pakai frame hasil cache apa adanya
+    df_view = df
+    show_df = show_all
     if q:
-        qq = q.lower()
-        df_view = df_view[
-            df_view["REQUEST_ID"].astype(str).str.lower().str.contains(qq, na=False)
-            | df_view["NO_SPBJ_KAPAL"].astype(str).str.lower().str.contains(qq, na=False)
-            | df_view["JUDUL_PERMINTAAN"].astype(str).str.lower().str.contains(qq, na=False)
-        ].copy()
-
-    show_df = pd.DataFrame(
-        {
-            "REQUEST_ID": df_view["REQUEST_ID"].astype(str),
-            "TGL_UPLOAD": df_view["TANGGAL_UPLOAD"].apply(fmt_ddmmyyyy),
-            "NO_SPBJ": df_view["NO_SPBJ_KAPAL"].astype(str),
-            "JUDUL": df_view["JUDUL_PERMINTAAN"].astype(str),
-            "LAMPIRAN": df_view["FILE_1"].astype(str),
-            "Evaluasi": df_view.apply(lambda r: stage_cell(r["EVALUASI_STATUS"], r["EVALUASI_TANGGAL"]), axis=1),
-            "Usulan": df_view.apply(lambda r: stage_cell(r["SURAT_USULAN_STATUS"], r["SURAT_USULAN_TANGGAL"]), axis=1),
-            "Persetujuan": df_view.apply(lambda r: stage_cell(r["SURAT_PERSETUJUAN_STATUS"], r["SURAT_PERSETUJUAN_TANGGAL"]), axis=1),
-            "SP2BJ": df_view.apply(lambda r: stage_cell(r["SP2BJ_STATUS"], r["SP2BJ_TANGGAL"]), axis=1),
-            "PO": df_view.apply(lambda r: stage_cell(r["PO_STATUS"], r["PO_TANGGAL"]), axis=1),
-            "Terbayar": df_view.apply(lambda r: stage_cell(r["TERBAYAR_STATUS"], r["TERBAYAR_TANGGAL"]), axis=1),
-            "Supply": df_view.apply(lambda r: stage_cell(r["SUPPLY_STATUS"], r["SUPPLY_TANGGAL"]), axis=1),
-        }
-    )
+        mask = search_mask(df, q)
+        df_view = df[mask]
+        show_df = show_all[mask]
+
+    # Tabel dipotong per halaman supaya yang dikirim ke browser tiap rerun tidak ikut membesar
+    n_pages = max(1, math.ceil(len(show_df) / TABLE_PAGE_SIZE))
+    col_pg1, col_pg2, col_pg3 = st.columns([1, 2, 2])
+    with col_pg1:
+        page = st.number_input("Halaman", min_value=1, max_value=n_pages, value=1, step=1, key=f"teknik_page_{q}")
+    with col_pg2:
+        start = (page - 1) * TABLE_PAGE_SIZE
+        st.caption(f"Menampilkan {min(start + 1, len(show_df))}–{min(start + TABLE_PAGE_SIZE, len(show_df))} dari {len(show_df)} permintaan.")
+    with col_pg3:
+        st.download_button(
+            "⬇️ Download CSV (semua hasil)",
+            data=teknik_csv_bytes(TEKNIK_KEY, q),
+            file_name="monitoring_pengadaan.csv",
+            mime="text/csv",
+        )
 
+    page_df = show_df.iloc[start : start + TABLE_PAGE_SIZE]
     st.dataframe(
-        show_df,
+        page_df,
         use_container_width=True,
         hide_index=True,
-        height=420,
+        height=min(35 * len(page_df) + 38, 800),
         column_config={
+            "TGL_UPLOAD": st.column_config.DateColumn("TGL_UPLOAD", format="DD-MM-YYYY"),
             "LAMPIRAN": st.column_config.LinkColumn("Lampiran", display_text="Download"),
         },
     )
@@ -364,14 +637,19 @@ with tab_teknik:
     st.markdown("---")
     st.markdown("### Update Progress (Pilih 1 REQUEST_ID)")
 
-    rid_list = df_view["REQUEST_ID"].astype(str).tolist()
+    # ID unik sesuai urutan tabel (ID dobel cukup sekali; rid_map memakai baris pertama).
+    # Tanpa filter, urutan itu sudah ada di rid_map.
+    if q:
+        rid_list = list(dict.fromkeys(df_view["REQUEST_ID"].astype(str)))
+    else:
+        rid_list = list(rid_map)
     if not rid_list:
         st.info("Tidak ada data sesuai filter.")
         st.stop()
 
     selected_rid = st.selectbox("REQUEST_ID", rid_list, key="pick_rid")
 
-    row = df[df["REQUEST_ID"].astype(str) == str(selected_rid)].iloc[0].to_dict()
+    row = rid_map[str(selected_rid)]
 
     colA, colB = st.columns([1.1, 1.2], gap="large")
 
@@ -380,7 +658,7 @@ with tab_teknik:
         st.write("**No SPBJ Kapal:**", row.get("NO_SPBJ_KAPAL", ""))
         st.write("**Judul:**", row.get("JUDUL_PERMINTAAN", ""))
 
-        files_list = parse_files_json(row.get("FILES_JSON"))
+        files_list = files_by_rid.get(str(selected_rid), [])
         st.markdown("**Lampiran (Download):**")
         if not files_list:
             st.caption("(Tidak ada file / belum terbaca)")
@@ -398,47 +676,4 @@ with tab_teknik:
                     st.markdown(f"- {name}")
 
     with colB:
-        st.info("Aturan: pilih **Done** ➜ wajib isi tanggal. Pilih **None/In Process** ➜ tanggal otomatis kosong.")
-
-        patch = {}
-
-        for code, label in STAGES:
-            s_col = f"{code}_STATUS"
-            d_col = f"{code}_TANGGAL"
-
-            st.markdown(f"#### {label}")
-
-            cur_status = clean_status(row.get(s_col, "None"))
-            status = st.selectbox(
-                f"Status {label}",
-                STATUS_OPTIONS,
-                index=STATUS_OPTIONS.index(cur_status) if cur_status in STATUS_OPTIONS else 0,
-                key=f"{selected_rid}_{code}_status",
-            )
-
-            if status == "Done":
-                cur_date = parse_date_any(row.get(d_col))
-                dval = st.date_input(
-                    f"Tanggal {label}",
-                    value=cur_date or date.today(),
-                    format="DD/MM/YYYY",
-                    key=f"{selected_rid}_{code}_date",
-                )
-                patch[s_col] = "Done"
-                patch[d_col] = iso_or_empty(dval)
-            else:
-                st.caption(f"Tanggal {label}: (kosong)")
-                patch[s_col] = status
-                patch[d_col] = ""
-
-        st.markdown("---")
-        if st.button("💾 Simpan Update", key="save_update"):
-            try:
-                res = api_update_request(str(selected_rid), patch)
-                if res.get("ok"):
-                    st.success("✅ Update tersimpan.")
-                    st.rerun()
-                else:
-                    st.error(f"Gagal: {res.get('error')}")
-            except Exception as e:
-                st.error(f"Error simpan: {e}")
+        update_form(row, selected_rid)